@@ -1,9 +1,8 @@
 #!/usr/bin/env python3
 import json
 import os
-import glob
 import hashlib
-from datetime import datetime, date, timedelta
+from datetime import datetime, date, timedelta, timezone
 
 REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(REPO_ROOT, "data")
@@ -58,9 +57,28 @@ def ics_escape(text: str) -> str:
 
 
 def uid_for(d: date, title: str) -> str:
-    raw = f"{d.isoformat()}|{title}"
-    h = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
-    return f"asp-{d.strftime('%Y%m%d')}-{h}@aspcalendar"
+    # UIDs must stay stable across runs so subscribed clients keep their events;
+    # keep the sha1 scheme, it is not used for security.
+    iso = d.isoformat()
+    h = hashlib.sha1(f"{iso}|{title}".encode("utf-8"), usedforsecurity=False).hexdigest()[:16]
+    return f"asp-{iso.replace('-', '')}-{h}@aspcalendar"
+
+
+def _data_files() -> list[str]:
+    """Paths of data/asp_suspensions_*.json, sorted."""
+    paths = []
+    try:
+        with os.scandir(DATA_DIR) as it:
+            for e in it:
+                if (
+                    e.name.startswith("asp_suspensions_")
+                    and e.name.endswith(".json")
+                    and e.is_file()
+                ):
+                    paths.append(e.path)
+    except FileNotFoundError:
+        pass
+    return sorted(paths)
 
 
 def load_all_suspensions() -> dict[date, list[str]]:
@@ -70,18 +88,23 @@ def load_all_suspensions() -> dict[date, list[str]]:
     with shape:
       { "2026-12-25": ["Christmas Day", "…"], ... }
     """
-    merged: dict[date, list[str]] = {}
+    # dict values act as insertion-ordered sets while merging files
+    names_by_day: dict[date, dict[str, None]] = {}
 
-    for path in sorted(glob.glob(os.path.join(DATA_DIR, "asp_suspensions_*.json"))):
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    for path in _data_files():
+        with open(path, "rb") as f:
+            data = json.loads(f.read())
         for day_str, names in data.items():
-            d = datetime.strptime(day_str, "%Y-%m-%d").date()
+            d = date.fromisoformat(day_str)
             if not isinstance(names, list):
                 names = [str(names)]
             # Merge / de-dupe names for same day
-            existing = merged.get(d, [])
-            merged[d] = sorted(set(existing + [str(x) for x in names if str(x).strip()]))
+            names_by_day.setdefault(d, {}).update(
+                dict.fromkeys(str(x) for x in names if str(x).strip())
+            )
+
+    # Sort once at the end so output order stays deterministic
+    merged = {d: sorted(names) for d, names in names_by_day.items()}
 
     # Optional: add a temporary test event (turn off by setting TEST_MODE=False)
     if TEST_MODE:
@@ -91,67 +114,81 @@ def load_all_suspensions() -> dict[date, list[str]]:
     return merged
 
 
-def build_ics(events_by_day: dict[date, list[str]]) -> str:
-    now_utc = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-
-    lines = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "PRODID:-//NYC ASP Live//EN",
-        "CALSCALE:GREGORIAN",
-        "X-WR-CALNAME:NYC Alternate Side Parking (Suspensions)",
-        "X-WR-TIMEZONE:America/New_York",
-    ]
-
-    for d in sorted(events_by_day.keys()):
-        holidays = events_by_day[d]
-        if not holidays:
-            continue
-
-        emo = emoji_for(holidays)
-        holiday_text = " / ".join(holidays)
-        summary = f"{emo} ASP Suspended — {holiday_text}"
-
-        # All-day event: DTEND is next day (exclusive)
-        dtstart = d.strftime("%Y%m%d")
-        dtend = (d + timedelta(days=1)).strftime("%Y%m%d")
-
-        description = (
-            f"Alternate Side Parking is suspended.\n"
-            f"Reason(s): {holiday_text}\n"
-            f"Source: NYC 311 / NYC DOT"
-        )
-
-        uid = uid_for(d, summary)
-
-        lines += [
-            "BEGIN:VEVENT",
-            f"UID:{uid}",
-            f"DTSTAMP:{now_utc}",
-            f"DTSTART;VALUE=DATE:{dtstart}",
-            f"DTEND;VALUE=DATE:{dtend}",
-            f"SUMMARY:{ics_escape(summary)}",
-            f"DESCRIPTION:{ics_escape(description)}",
-            # 8:00am alert the day-of (works in Apple Calendar for subscribed calendars)
-            "BEGIN:VALARM",
-            "ACTION:DISPLAY",
-            f"DESCRIPTION:{ics_escape(summary)}",
-            "TRIGGER;RELATED=START:PT8H",
-            "END:VALARM",
-            "END:VEVENT",
-        ]
-
-    lines.append("END:VCALENDAR")
-    return "\n".join(lines) + "\n"
+ICS_HEADER = (
+    "BEGIN:VCALENDAR\n"
+    "VERSION:2.0\n"
+    "PRODID:-//NYC ASP Live//EN\n"
+    "CALSCALE:GREGORIAN\n"
+    "X-WR-CALNAME:NYC Alternate Side Parking (Suspensions)\n"
+    "X-WR-TIMEZONE:America/New_York\n"
+).encode("utf-8")
+ICS_FOOTER = b"END:VCALENDAR\n"
+
+
+def build_all_day_event(d: date, holidays: list[str], now_utc: str) -> bytes:
+    emo = emoji_for(holidays)
+    holiday_text = " / ".join(holidays)
+    summary = f"{emo} ASP Suspended — {holiday_text}"
+
+    # All-day event: DTEND is next day (exclusive)
+    dtstart = d.strftime("%Y%m%d")
+    dtend = (d + timedelta(days=1)).strftime("%Y%m%d")
+
+    description = (
+        f"Alternate Side Parking is suspended.\n"
+        f"Reason(s): {holiday_text}\n"
+        f"Source: NYC 311 / NYC DOT"
+    )
+
+    uid = uid_for(d, summary)
+    esc_summary = ics_escape(summary)
+
+    return (
+        "BEGIN:VEVENT\n"
+        f"UID:{uid}\n"
+        f"DTSTAMP:{now_utc}\n"
+        f"DTSTART;VALUE=DATE:{dtstart}\n"
+        f"DTEND;VALUE=DATE:{dtend}\n"
+        f"SUMMARY:{esc_summary}\n"
+        f"DESCRIPTION:{ics_escape(description)}\n"
+        # 8:00am alert the day-of (works in Apple Calendar for subscribed calendars)
+        "BEGIN:VALARM\n"
+        "ACTION:DISPLAY\n"
+        f"DESCRIPTION:{esc_summary}\n"
+        "TRIGGER;RELATED=START:PT8H\n"
+        "END:VALARM\n"
+        "END:VEVENT\n"
+    ).encode("utf-8")
+
+
+def write_calendar(path: str, events_by_day: dict[date, list[str]]) -> None:
+    """
+    Stream the calendar one VEVENT at a time into a temp file, then move it
+    over `path` so a failure never leaves a partial calendar published.
+    """
+    now_utc = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    tmp = path + ".tmp"
+
+    try:
+        with open(tmp, "wb", buffering=1 << 16) as f:
+            f.write(ICS_HEADER)
+            for d in sorted(events_by_day.keys()):
+                holidays = events_by_day[d]
+                if not holidays:
+                    continue
+                f.write(build_all_day_event(d, holidays, now_utc))
+            f.write(ICS_FOOTER)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
 
 
 def main():
     os.makedirs(os.path.dirname(OUT_ICS), exist_ok=True)
     events = load_all_suspensions()
-    ics = build_ics(events)
-
-    with open(OUT_ICS, "w", encoding="utf-8") as f:
-        f.write(ics)
+    write_calendar(OUT_ICS, events)
 
     print(f"Wrote {OUT_ICS} with {len(events)} suspended-day entries.")
 